@@ -1,55 +1,143 @@
-from flask import Flask, request, jsonify, send_file
-from pdf2image import convert_from_bytes
-from PIL import Image
+from flask import Flask, Response, request, jsonify, send_file
+import fitz  # PyMuPDF
 import io
+import json
 import base64
+import binascii
 import requests
 import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from werkzeug.utils import secure_filename
-import tempfile
 import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+try:
+    import pybase64
+except ImportError:
+    pybase64 = None
+
+# pybase64 vendors libbase64 (SSSE3/AVX2/AVX-512 kernels) and runs at close
+# to memcpy speed on the multi-megabyte buffers we encode per request
+if pybase64 is not None:
+    _b64encode_bytes = pybase64.b64encode
+    _b64decode = pybase64.b64decode
+else:
+    def _b64encode_bytes(data):
+        return binascii.b2a_base64(data, newline=False)
+    _b64decode = base64.b64decode
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson serializes ASCII-heavy payloads several times faster than stdlib
+# json by using SIMD for its escape scanning
+def _json_dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode('utf-8')
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
 
 app = Flask(__name__)
 
-def pdf_page_to_image(pdf_data, page_number=0, dpi=300):
-    """Convert PDF page to image using pdf2image"""
+# Gzip responses in transit when flask-compress is available. Base64 of
+# already-compressed image data is near-random (JPEG bodies only shrink to
+# ~75%), so level 1 takes what the base64 expansion gives back without
+# burning the CPU that zlib's default level 6 would
+if Compress is not None:
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    app.config['COMPRESS_LEVEL'] = 1
+    Compress(app)
+
+MAX_PDF_BYTES = 10 * 1024 * 1024  # 10MB limit for free tier
+
+# One shared session so repeated fetches from the same host (typical for
+# Make.com scenarios) reuse keep-alive connections and warm TLS sessions
+# instead of paying a fresh handshake per request
+_SESSION = requests.Session()
+_SESSION_ADAPTER = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504)),
+)
+_SESSION.mount('https://', _SESSION_ADAPTER)
+_SESSION.mount('http://', _SESSION_ADAPTER)
+
+# Make.com retries and multi-step scenarios frequently re-send the same PDF
+# page; a cache hit skips rasterization entirely, which dominates CPU.
+# Entries are rendered images (MBs each), so the cache is kept small.
+_RENDER_CACHE = OrderedDict()
+_RENDER_CACHE_MAX = 64
+_RENDER_CACHE_LOCK = threading.Lock()
+
+def _render_cache_key(pdf_digest, page_num, dpi, image_format, quality, colorspace, tile=None):
+    return (pdf_digest, page_num, dpi, image_format, quality, colorspace, tile)
+
+def _render_cache_get(key):
+    with _RENDER_CACHE_LOCK:
+        img_binary = _RENDER_CACHE.get(key)
+        if img_binary is not None:
+            _RENDER_CACHE.move_to_end(key)
+        return img_binary
+
+def _render_cache_put(key, img_binary):
+    with _RENDER_CACHE_LOCK:
+        _RENDER_CACHE[key] = img_binary
+        _RENDER_CACHE.move_to_end(key)
+        while len(_RENDER_CACHE) > _RENDER_CACHE_MAX:
+            _RENDER_CACHE.popitem(last=False)
+
+def _download_pdf(url, timeout=20, check_content_type=False):
+    """
+    Stream a PDF download into memory, enforcing the size cap mid-stream.
+
+    Reading chunk-by-chunk avoids buffering the body twice and aborts the
+    transfer as soon as the cap is exceeded, instead of downloading an
+    arbitrarily large body before rejecting it.
+    """
+    response = _SESSION.get(url, timeout=timeout, stream=True)
     try:
-        # Convert PDF to images
-        images = convert_from_bytes(
-            pdf_data, 
-            dpi=dpi,
-            first_page=page_number + 1,  # pdf2image uses 1-indexed pages
-            last_page=page_number + 1,
-            fmt='PNG'
-        )
-        
-        if not images:
-            raise ValueError(f"Could not convert page {page_number + 1}")
-            
-        # Get the image
-        image = images[0]
-        
-        # Convert to bytes
-        img_buffer = io.BytesIO()
-        image.save(img_buffer, format='PNG', optimize=True)
-        img_data = img_buffer.getvalue()
-        
-        # Convert to base64
-        img_base64 = base64.b64encode(img_data).decode('utf-8')
-        
-        return img_base64, img_data
-        
-    except Exception as e:
-        if "first page is after last page" in str(e).lower():
-            raise ValueError(f"Page {page_number + 1} does not exist in the PDF")
-        raise e
+        if response.status_code != 200:
+            raise ValueError(f'Failed to download PDF: HTTP {response.status_code}')
+
+        if check_content_type:
+            content_type = response.headers.get('content-type', '').lower()
+            if 'pdf' not in content_type and not url.lower().endswith('.pdf'):
+                raise ValueError('URL does not point to a PDF file')
+
+        buf = bytearray()
+        for chunk in response.iter_content(65536):
+            buf.extend(chunk)
+            if len(buf) > MAX_PDF_BYTES:
+                raise ValueError('PDF file too large. Maximum size: 10MB')
+        if not buf.startswith(b'%PDF-'):
+            raise ValueError('Downloaded file is not a PDF')
+        return bytes(buf)
+    finally:
+        response.close()
+
+def pdf_page_to_image(pdf_data, page_number=0, dpi=300, image_format='jpeg', quality=85, colorspace='rgb', tile=None):
+    """Convert a single PDF page to image bytes using PyMuPDF"""
+    for _, img_binary, error in render_pages(pdf_data, [page_number + 1], dpi, image_format, quality, colorspace, tile):
+        if error is not None:
+            raise ValueError(error)
+        return img_binary
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for Make.com"""
     return jsonify({
         'status': 'healthy',
-        'message': 'PDF to Image API is running (pdf2image)',
+        'message': 'PDF to Image API is running (PyMuPDF)',
         'version': '1.1'
     })
 
@@ -67,56 +155,79 @@ def convert_pdf():
     - page: page number (1-indexed, default: 1)
     - dpi: image resolution (default: 300)
     - format: response format ('base64' or 'binary', default: 'base64')
+    - image_format: output image format ('jpeg' or 'png', default: 'jpeg')
+    - quality: JPEG quality 1-95 (default: 85)
+    - colorspace: 'rgb' or 'gray' (default: 'rgb'; gray is smaller for text scans)
+    - tile: 'row,col,rows,cols' to render one cell of a grid over the page
+      (bounds memory on oversize pages; stitching is left to the client)
     """
     try:
+        # Parse the body once; request.json re-parses on repeated access
+        body = request.get_json(silent=True) or {}
+        form = request.form
+
         # Get parameters
-        page_num = int(request.form.get('page', request.json.get('page', 1) if request.json else 1)) - 1
-        dpi = int(request.form.get('dpi', request.json.get('dpi', 300) if request.json else 300))
-        response_format = request.form.get('format', request.json.get('format', 'base64') if request.json else 'base64')
-        
+        page_num = int(form.get('page', body.get('page', 1))) - 1
+        dpi = int(form.get('dpi', body.get('dpi', 300)))
+        response_format = form.get('format', body.get('format', 'base64'))
+        image_format = form.get('image_format', body.get('image_format', 'jpeg')).lower()
+        quality = int(form.get('quality', body.get('quality', 85)))
+        colorspace = form.get('colorspace', body.get('colorspace', 'rgb')).lower()
+        tile = form.get('tile', body.get('tile')) or request.args.get('tile')
+
+        if tile:
+            try:
+                row, col, rows, cols = (int(v) for v in str(tile).split(','))
+                if rows < 1 or cols < 1 or not (0 <= row < rows and 0 <= col < cols):
+                    raise ValueError
+            except ValueError:
+                return jsonify({'error': "tile must be 'row,col,rows,cols' with 0 <= row < rows and 0 <= col < cols"}), 400
+            tile = (row, col, rows, cols)
+        else:
+            tile = None
+
+        if image_format not in ('jpeg', 'png'):
+            return jsonify({'error': "image_format must be 'jpeg' or 'png'"}), 400
+        if colorspace not in ('rgb', 'gray'):
+            return jsonify({'error': "colorspace must be 'rgb' or 'gray'"}), 400
+        quality = min(max(quality, 1), 95)
+
         # Limit DPI to prevent timeouts on free tier
         dpi = min(dpi, 400)
         
         pdf_data = None
-        filename = "converted_page"
+        upload_name = None
+        source = 'converted'
         
-        # Handle different input methods
+        # Handle different input methods; the response filename is derived
+        # lazily since most calls return JSON and never download a file
         if request.files and 'pdf' in request.files:
             # Method 1: Direct file upload
             file = request.files['pdf']
             if not file.filename.lower().endswith('.pdf'):
                 return jsonify({'error': 'File must be a PDF'}), 400
             pdf_data = file.read()
-            filename = secure_filename(file.filename.replace('.pdf', ''))
+            upload_name = file.filename
             
-        elif request.json and 'pdf_url' in request.json:
+        elif 'pdf_url' in body:
             # Method 2: Download from URL
-            pdf_url = request.json['pdf_url']
+            pdf_url = body['pdf_url']
             try:
-                response = requests.get(pdf_url, timeout=20, stream=True)
-                if response.status_code != 200:
-                    return jsonify({'error': f'Failed to download PDF: HTTP {response.status_code}'}), 400
-                
-                # Check content type
-                content_type = response.headers.get('content-type', '').lower()
-                if 'pdf' not in content_type and not pdf_url.lower().endswith('.pdf'):
-                    return jsonify({'error': 'URL does not point to a PDF file'}), 400
-                
-                pdf_data = response.content
-                filename = f"url_pdf_{uuid.uuid4().hex[:8]}"
-                
+                pdf_data = _download_pdf(pdf_url, check_content_type=True)
+                source = 'url'
+
             except requests.exceptions.Timeout:
                 return jsonify({'error': 'Timeout downloading PDF from URL'}), 408
             except requests.exceptions.RequestException as e:
                 return jsonify({'error': f'Failed to download PDF: {str(e)}'}), 400
             
-        elif request.json and 'pdf_base64' in request.json:
+        elif 'pdf_base64' in body:
             # Method 3: Base64 encoded PDF
             try:
-                pdf_data = base64.b64decode(request.json['pdf_base64'])
+                pdf_data = _b64decode(body['pdf_base64'], validate=False)
             except Exception as e:
                 return jsonify({'error': 'Invalid base64 PDF data'}), 400
-            filename = f"base64_pdf_{uuid.uuid4().hex[:8]}"
+            source = 'base64'
             
         else:
             return jsonify({'error': 'No PDF provided. Use file upload, pdf_url, or pdf_base64'}), 400
@@ -125,93 +236,378 @@ def convert_pdf():
             return jsonify({'error': 'No PDF data received'}), 400
         
         # Check file size (limit for free tier)
-        if len(pdf_data) > 10 * 1024 * 1024:  # 10MB limit
+        if len(pdf_data) > MAX_PDF_BYTES:
             return jsonify({'error': 'PDF file too large. Maximum size: 10MB'}), 400
+
+        if not pdf_data.startswith(b'%PDF-'):
+            return jsonify({'error': 'Not a PDF'}), 400
         
-        # Convert PDF to image
-        img_base64, img_binary = pdf_page_to_image(pdf_data, page_num, dpi)
-        
-        # Return response based on format
-        if response_format == 'binary':
-            return send_file(
+        pdf_digest = hashlib.sha256(pdf_data).digest()
+        cache_key = _render_cache_key(pdf_digest, page_num, dpi, image_format, quality, colorspace, tile)
+
+        ext = 'png' if image_format == 'png' else 'jpg'
+
+        # Clients that accept the image mimetype directly get raw bytes and
+        # skip the base64 pass entirely
+        wants_binary = response_format == 'binary' or request.accept_mimetypes.best in (
+            'image/png', 'image/jpeg', 'application/octet-stream'
+        )
+
+        # The etag derives from the render cache key, so a resend of an
+        # identical (pdf, page, settings) request returns a bodyless 304
+        # before any render or cache work. The comparison is done here
+        # because Werkzeug's conditional support only applies to GET/HEAD
+        # and this endpoint is POST-only.
+        # The tile tuple is flattened to dotted numbers; str(tuple) would
+        # put spaces and parentheses in the ETag, which RFC 7232 forbids
+        etag = '-'.join(
+            '.'.join(str(v) for v in part) if isinstance(part, tuple) else str(part)
+            for part in (pdf_digest.hex()[:16],) + cache_key[1:]
+        )
+        if wants_binary and etag in request.if_none_match:
+            resp = Response(status=304)
+            resp.set_etag(etag)
+            resp.headers['Cache-Control'] = 'public, max-age=3600'
+            return resp
+
+        # Convert PDF to image, reusing a cached render when available
+        img_binary = _render_cache_get(cache_key)
+        if img_binary is None:
+            img_binary = pdf_page_to_image(pdf_data, page_num, dpi, image_format, quality, colorspace, tile)
+            _render_cache_put(cache_key, img_binary)
+
+        if wants_binary:
+            # Only the download name needs the secure_filename scrub and a
+            # uuid suffix; the JSON path below gets by with a cheap string
+            if upload_name:
+                filename = secure_filename(upload_name.replace('.pdf', '')) or 'converted_page'
+            else:
+                filename = f'{source}_pdf_{uuid.uuid4().hex[:8]}'
+            resp = send_file(
                 io.BytesIO(img_binary),
-                mimetype='image/png',
+                mimetype=f'image/{image_format}',
                 as_attachment=True,
-                download_name=f'{filename}_page_{page_num + 1}.png'
+                download_name=f'{filename}_page_{page_num + 1}.{ext}',
+                etag=etag
             )
+            resp.headers['Cache-Control'] = 'public, max-age=3600'
+            return resp
         else:
-            # Default: base64 response (best for Make.com)
-            return jsonify({
-                'success': True,
-                'image_base64': img_base64,
-                'filename': f'{filename}_page_{page_num + 1}.png',
-                'page': page_num + 1,
-                'dpi': dpi,
-                'format': 'PNG',
-                'size_bytes': len(img_binary)
-            })
+            # Default: base64 response (best for Make.com). The body is
+            # assembled from byte parts so the multi-MB base64 blob is
+            # encoded exactly once and never copied through a Python str
+            # (base64 output is plain ASCII and needs no JSON escaping).
+            # The cheap display name skips the secure_filename scrub and
+            # uuid; it is JSON-escaped since upload names are caller input
+            filename = upload_name.rsplit('.', 1)[0] if upload_name else f'{source}_pdf'
+            head = b'{"success": true, "image_base64": "'
+            tail = (
+                b'", "filename": ' + _json_dumps(f'{filename}_page_{page_num + 1}.{ext}') + (
+                    f', "page": {page_num + 1}, "dpi": {dpi},'
+                    f' "format": "{image_format.upper()}",'
+                    f' "size_bytes": {len(img_binary)}}}'
+                ).encode()
+            )
+            return app.response_class(
+                [head, _b64encode_bytes(img_binary), tail],
+                mimetype='application/json'
+            )
             
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Conversion failed: {str(e)}'}), 500
 
+def render_pages(pdf_data, pages, dpi=300, image_format='jpeg', quality=85, colorspace='rgb', tile=None):
+    """
+    Render several pages from a single parsed document using PyMuPDF.
+
+    Parses the PDF once and keeps the document open across pages instead
+    of re-parsing it per page. Grayscale output ('gray') carries one byte
+    per pixel instead of three, which matters for text scans since
+    everything downstream of the rasterizer is memory-bound. tile, given
+    as (row, col, rows, cols), clips rendering to one cell of a grid over
+    the page so peak memory is bounded by a single tile rather than the
+    whole raster. Yields (page_number, image_bytes, error) tuples; error
+    is None on success.
+    """
+    # Cheap header check: rejecting junk here avoids a full MuPDF parse
+    # of an arbitrary buffer
+    if not pdf_data.startswith(b'%PDF-'):
+        raise ValueError('Not a PDF')
+
+    # A corrupt body behind a valid header surfaces as a per-page error,
+    # keeping the batch contract of one entry per requested page
+    try:
+        doc = fitz.open(stream=pdf_data, filetype='pdf')
+    except Exception as e:
+        for page_num in pages:
+            yield page_num, None, str(e)
+        return
+
+    try:
+        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        cs = fitz.csGRAY if colorspace == 'gray' else fitz.csRGB
+        for page_num in pages:
+            try:
+                if not 1 <= page_num <= doc.page_count:
+                    raise ValueError(f"Page {page_num} does not exist in the PDF")
+                page = doc[page_num - 1]
+                clip = None
+                if tile is not None:
+                    row, col, rows, cols = tile
+                    rect = page.rect
+                    tile_w = rect.width / cols
+                    tile_h = rect.height / rows
+                    clip = fitz.Rect(
+                        rect.x0 + col * tile_w,
+                        rect.y0 + row * tile_h,
+                        rect.x0 + (col + 1) * tile_w,
+                        rect.y0 + (row + 1) * tile_h,
+                    )
+                pix = page.get_pixmap(matrix=mat, colorspace=cs, alpha=False, clip=clip)
+                if image_format == 'png':
+                    yield page_num, pix.tobytes('png'), None
+                else:
+                    yield page_num, pix.tobytes('jpg', jpg_quality=quality), None
+            except Exception as e:
+                yield page_num, None, str(e)
+    finally:
+        doc.close()
+
+_EXECUTOR = None
+_DOWNLOAD_EXECUTOR = None
+# Guards the lazy pool creation: gthread workers serve concurrent first
+# requests, and an unsynchronized double-init would leak a spawned pool
+_EXECUTOR_LOCK = threading.Lock()
+
+def _get_executor():
+    """Lazily create the render pool so plain imports stay cheap"""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _EXECUTOR
+
+def _get_download_executor():
+    """Lazily create the download pool (I/O-bound, so threads suffice)"""
+    global _DOWNLOAD_EXECUTOR
+    if _DOWNLOAD_EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _DOWNLOAD_EXECUTOR is None:
+                _DOWNLOAD_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+    return _DOWNLOAD_EXECUTOR
+
+def _render_one(sub_pdf_data, dpi, image_format='jpeg', quality=85, colorspace='rgb'):
+    """Render the single page of an extracted sub-PDF (pool worker)"""
+    for _, img_binary, error in render_pages(sub_pdf_data, [1], dpi, image_format, quality, colorspace):
+        return img_binary, error
+
+def _render_batch(pdf_data, pages, dpi, image_format='jpeg', quality=85, colorspace='rgb'):
+    """
+    Render a batch of pages, fanning out across the process pool.
+
+    Rendering is CPU-bound and independent per page, so multi-page jobs
+    are split across workers. The parent parses the document once and
+    ships each worker a one-page sub-PDF instead of the full file, so
+    workers never re-parse the whole document. Single-page jobs render
+    in-process to skip the IPC round-trip. Cached renders are reused and
+    never re-submitted. Returns (page_number, image_bytes, error) tuples
+    in the order requested.
+    """
+    pdf_digest = hashlib.sha256(pdf_data).digest()
+    keys = {
+        page_num: _render_cache_key(pdf_digest, page_num - 1, dpi, image_format, quality, colorspace)
+        for page_num in pages
+    }
+
+    rendered = {}
+    to_render = []
+    for page_num in pages:
+        img_binary = _render_cache_get(keys[page_num])
+        if img_binary is not None:
+            rendered[page_num] = (img_binary, None)
+        else:
+            to_render.append(page_num)
+
+    if len(to_render) == 1:
+        page_num = to_render[0]
+        for _, img_binary, error in render_pages(pdf_data, [page_num], dpi, image_format, quality, colorspace):
+            rendered[page_num] = (img_binary, error)
+    elif to_render:
+        futures = {}
+        try:
+            doc = fitz.open(stream=pdf_data, filetype='pdf')
+        except Exception as e:
+            for page_num in to_render:
+                rendered[page_num] = (None, str(e))
+            return [(page_num,) + rendered[page_num] for page_num in pages]
+        try:
+            executor = _get_executor()
+            for page_num in to_render:
+                if not 1 <= page_num <= doc.page_count:
+                    rendered[page_num] = (None, f"Page {page_num} does not exist in the PDF")
+                    continue
+                single = fitz.open()
+                single.insert_pdf(doc, from_page=page_num - 1, to_page=page_num - 1)
+                futures[executor.submit(_render_one, single.tobytes(), dpi, image_format, quality, colorspace)] = page_num
+                single.close()
+        finally:
+            doc.close()
+
+        for future in as_completed(futures):
+            page_num = futures[future]
+            try:
+                rendered[page_num] = future.result()
+            except Exception as e:
+                rendered[page_num] = (None, str(e))
+
+    for page_num in to_render:
+        img_binary, error = rendered[page_num]
+        if error is None:
+            _render_cache_put(keys[page_num], img_binary)
+
+    return [(page_num,) + rendered[page_num] for page_num in pages]
+
+def _multipart_response(results, mimetype='image/jpeg'):
+    """Stream batch results as multipart/mixed with binary parts"""
+    boundary = uuid.uuid4().hex
+
+    def generate():
+        for page_num, img_binary, error in results:
+            yield f'--{boundary}\r\n'.encode()
+            if error is None:
+                yield (
+                    f'Content-Type: {mimetype}\r\n'
+                    f'Content-Transfer-Encoding: binary\r\n'
+                    f'X-Page: {page_num}\r\n'
+                    f'Content-Length: {len(img_binary)}\r\n\r\n'
+                ).encode()
+                yield img_binary
+            else:
+                yield (
+                    f'Content-Type: text/plain\r\n'
+                    f'X-Page: {page_num}\r\n'
+                    f'X-Error: true\r\n\r\n'
+                ).encode()
+                yield error.encode('utf-8')
+            yield b'\r\n'
+        yield f'--{boundary}--\r\n'.encode()
+
+    return Response(generate(), mimetype=f'multipart/mixed; boundary={boundary}')
+
+def _results_json_parts(results):
+    """
+    Byte parts for a results array; keeps the base64 blobs out of the
+    serializer (encoded once, spliced in as ASCII)
+    """
+    parts = [b'[']
+    for i, (page_num, img_binary, error) in enumerate(results):
+        if i:
+            parts.append(b', ')
+        if error is None:
+            parts.append(f'{{"page": {page_num}, "success": true, "image_base64": "'.encode())
+            parts.append(_b64encode_bytes(img_binary))
+            parts.append(f'", "size_bytes": {len(img_binary)}}}'.encode())
+        else:
+            parts.append(_json_dumps({'page': page_num, 'success': False, 'error': error}))
+    parts.append(b']')
+    return parts
+
 @app.route('/convert-batch', methods=['POST'])
 def convert_pdf_batch():
     """
     Batch conversion endpoint for multiple pages
+
+    Accepts a single document (pdf_url or pdf_base64) or a list of
+    documents via pdf_urls. With pdf_urls, downloads run on a thread
+    pool so the next document streams in while the current one renders.
+    Pages are encoded as JPEG straight from MuPDF (libjpeg-turbo) by
+    default; image_format and quality work as on /convert.
     """
     try:
-        if not request.json:
+        # Parse the body once; request.json re-parses on repeated access
+        body = request.get_json(silent=True)
+        if not body:
             return jsonify({'error': 'JSON payload required'}), 400
-            
-        pages = request.json.get('pages', [1])
-        dpi = min(request.json.get('dpi', 300), 400)  # Limit DPI
-        
+
+        pages = body.get('pages', [1])
+        dpi = min(body.get('dpi', 300), 400)  # Limit DPI
+        colorspace = str(body.get('colorspace', 'rgb')).lower()
+        image_format = str(body.get('image_format', 'jpeg')).lower()
+        quality = min(max(int(body.get('quality', 85)), 1), 95)
+        if colorspace not in ('rgb', 'gray'):
+            return jsonify({'error': "colorspace must be 'rgb' or 'gray'"}), 400
+        if image_format not in ('jpeg', 'png'):
+            return jsonify({'error': "image_format must be 'jpeg' or 'png'"}), 400
+
         # Limit number of pages for free tier
         if len(pages) > 5:
             return jsonify({'error': 'Maximum 5 pages allowed in batch mode'}), 400
-        
+
+        # Multiple documents: download ahead while rendering
+        if 'pdf_urls' in body:
+            urls = body['pdf_urls']
+            if not isinstance(urls, list) or not urls:
+                return jsonify({'error': 'pdf_urls must be a non-empty list'}), 400
+            if len(urls) > 5:
+                return jsonify({'error': 'Maximum 5 documents allowed in batch mode'}), 400
+
+            executor = _get_download_executor()
+            downloads = [(url, executor.submit(_download_pdf, url)) for url in urls]
+
+            parts = [b'{"success": true, "documents": [']
+            for i, (url, future) in enumerate(downloads):
+                if i:
+                    parts.append(b', ')
+                # Rendering stays inside the try so one bad document (failed
+                # download or unrenderable body) doesn't abort the rest
+                try:
+                    pdf_data = future.result()
+                    if len(pdf_data) > MAX_PDF_BYTES:
+                        raise ValueError('PDF file too large for batch processing')
+                    results = _render_batch(pdf_data, pages, dpi, image_format, quality, colorspace)
+                except Exception as e:
+                    parts.append(_json_dumps({'pdf_url': url, 'success': False, 'error': str(e)}))
+                    continue
+                parts.append(b'{"pdf_url": ' + _json_dumps(url) + b', "success": true, "results": ')
+                parts.extend(_results_json_parts(results))
+                parts.append(f', "total_pages": {len(pages)}}}'.encode())
+            parts.append(f'], "total_documents": {len(urls)}}}'.encode())
+            return app.response_class(parts, mimetype='application/json')
+
         # Get PDF data
         pdf_data = None
-        if 'pdf_url' in request.json:
-            response = requests.get(request.json['pdf_url'], timeout=20)
-            if response.status_code != 200:
-                return jsonify({'error': 'Failed to download PDF'}), 400
-            pdf_data = response.content
-        elif 'pdf_base64' in request.json:
-            pdf_data = base64.b64decode(request.json['pdf_base64'])
+        if 'pdf_url' in body:
+            try:
+                pdf_data = _download_pdf(body['pdf_url'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        elif 'pdf_base64' in body:
+            pdf_data = _b64decode(body['pdf_base64'], validate=False)
         else:
-            return jsonify({'error': 'pdf_url or pdf_base64 required'}), 400
-        
+            return jsonify({'error': 'pdf_url, pdf_urls, or pdf_base64 required'}), 400
+
         # Check file size
-        if len(pdf_data) > 10 * 1024 * 1024:
+        if len(pdf_data) > MAX_PDF_BYTES:
             return jsonify({'error': 'PDF file too large for batch processing'}), 400
-        
-        # Convert multiple pages
-        results = []
-        for page_num in pages:
-            try:
-                img_base64, img_binary = pdf_page_to_image(pdf_data, page_num - 1, dpi)
-                results.append({
-                    'page': page_num,
-                    'success': True,
-                    'image_base64': img_base64,
-                    'size_bytes': len(img_binary)
-                })
-            except Exception as e:
-                results.append({
-                    'page': page_num,
-                    'success': False,
-                    'error': str(e)
-                })
-        
-        return jsonify({
-            'success': True,
-            'results': results,
-            'total_pages': len(pages)
-        })
-        
+
+        if not pdf_data.startswith(b'%PDF-'):
+            return jsonify({'error': 'Not a PDF'}), 400
+
+        # Convert multiple pages, fanned out across the render pool
+        results = _render_batch(pdf_data, pages, dpi, image_format, quality, colorspace)
+
+        # Multipart response streams raw image bytes, skipping base64
+        if body.get('format') == 'multipart' or request.args.get('format') == 'multipart':
+            return _multipart_response(results, mimetype=f'image/{image_format}')
+
+        parts = [b'{"success": true, "results": ']
+        parts.extend(_results_json_parts(results))
+        parts.append(f', "total_pages": {len(pages)}}}'.encode())
+        return app.response_class(parts, mimetype='application/json')
+
     except Exception as e:
         return jsonify({'error': f'Batch conversion failed: {str(e)}'}), 500
 
@@ -225,4 +621,5 @@ def test_webhook():
     })
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Local development only; production runs under Gunicorn (render.yaml)
+    app.run(host='127.0.0.1', port=5000)